@@ -1,11 +1,14 @@
 """OpenAI Realtime API client."""
 import asyncio
+import logging
 import json
 import base64
 import websockets
 from typing import Optional, Callable, Dict, Any, List
 from app.config import Config
 
+logger = logging.getLogger(__name__)
+
 
 class OpenAIRealtimeClient:
     """Client for OpenAI Realtime API WebSocket connection."""
@@ -151,7 +154,7 @@ class OpenAIRealtimeClient:
             error_type = error.get("type", "unknown")
             error_message = error.get("message", "No message")
             print(f"❌ OpenAI error: {error_type} - {error_message}")
-            # Print full error for debugging
+            # Print full error for debugging (same channel as the line above, so they stay together)
             print(f"   Full error: {message}")
         
         elif msg_type == "response.created":
@@ -182,9 +185,7 @@ class OpenAIRealtimeClient:
                     if asyncio.iscoroutine(result):
                         await result
                 except Exception as e:
-                    print(f"❌ Error decoding audio: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.exception("❌ Error decoding audio: %s", e)
         
         elif msg_type == "response.function_call_arguments.done":
             # Function call arguments completed
@@ -151,11 +151,10 @@ class ToolHandler:
         print(f"🔧 Executing tool: {ha_service} with arguments: {arguments}")
         
         # Parse service (e.g., "script.open_wohnungstur" -> domain="script", service="open_wohnungstur")
-        if "." not in ha_service:
+        domain, sep, service = ha_service.partition(".")
+        if not sep:
             raise ValueError(f"Invalid ha_service format: {ha_service}")
         
-        domain, service = ha_service.split(".", 1)
-        
         # Extract entity_id from arguments (if present)
         entity_id = arguments.get("entity_id")
         
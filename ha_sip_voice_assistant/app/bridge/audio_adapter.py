@@ -1,16 +1,60 @@
 """Audio adapter - resampling dynamically based on SIP codec ↔ 24kHz with scipy."""
 import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from math import gcd
 import numpy as np
 from scipy import signal
-from typing import Optional
+from typing import Tuple
+from app.utils.throttled_log import ThrottledLogger
+
+logger = logging.getLogger(__name__)
 
 # OpenAI sample rate
 OPENAI_SAMPLE_RATE = 24000  # OpenAI Realtime API uses 24kHz
 
+# Max queued uplink frames folded into one resample call when the uplink falls behind
+UPLINK_MAX_BATCH = 4
+
+# Shared pool for resampling - numpy/scipy release the GIL, so this keeps CPU work off the event loop
+_RESAMPLE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="AudioResample")
+
+
+@lru_cache(maxsize=None)
+def _polyphase_kernel(up: int, down: int) -> np.ndarray:
+    """Design the anti-aliasing FIR for an up/down ratio once (same filter resample_poly would build per call)."""
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    return signal.firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)).astype(np.float32)
+
+
+def _rational_ratio(src_rate: int, dst_rate: int) -> Tuple[int, int]:
+    """Reduce src → dst rate conversion to integer (up, down) factors, e.g. 16k → 24k = (3, 2)."""
+    g = gcd(src_rate, dst_rate)
+    return dst_rate // g, src_rate // g
+
+
+def _resample_pcm16(pcm16_data: bytes, ratio: Tuple[int, int], kernel: np.ndarray) -> memoryview:
+    """Resample a PCM16 buffer in one pass: decode, filter, clip in place, re-encode."""
+    # Filter in int16 scale directly - the FIR is linear, so normalizing to [-1, 1] and back is pure overhead
+    samples = np.frombuffer(pcm16_data, dtype=np.int16).astype(np.float32)
+    resampled = signal.resample_poly(samples, ratio[0], ratio[1], window=kernel)
+    np.clip(resampled, -32768.0, 32767.0, out=resampled)
+    # Hand back a byte view of the int16 array - base64/bytearray consume it without a tobytes() copy
+    return memoryview(resampled.astype(np.int16)).cast("B")
+
 
 class AudioAdapter:
     """Adapter for audio format conversion and buffering."""
     
+    __slots__ = (
+        "sip_sample_rate", "pcm16_frame_size_sip", "pcm16_frame_size_24k",
+        "silence_sip", "silence_24k",
+        "_up_ratio", "_down_ratio", "_up_kernel", "_down_kernel",
+        "uplink_queue", "downlink_queue", "downlink_buffer", "_warn",
+    )
+    
     # Frame sizes
     FRAME_SIZE_MS = 20
     
@@ -20,6 +64,16 @@ class AudioAdapter:
         self.pcm16_frame_size_sip = (sample_rate * self.FRAME_SIZE_MS * 2) // 1000  # PCM16 bytes per 20ms
         self.pcm16_frame_size_24k = 960  # 20ms * 24000Hz * 2 bytes
         
+        # Silence frames built once - returned on timeouts and used to short-circuit resampling
+        self.silence_sip = bytes(self.pcm16_frame_size_sip)
+        self.silence_24k = bytes(self.pcm16_frame_size_24k)
+        
+        # Fixed polyphase FIR kernels for both directions (designed once, not per frame)
+        self._up_ratio = _rational_ratio(sample_rate, OPENAI_SAMPLE_RATE)
+        self._down_ratio = _rational_ratio(OPENAI_SAMPLE_RATE, sample_rate)
+        self._up_kernel = _polyphase_kernel(*self._up_ratio)
+        self._down_kernel = _polyphase_kernel(*self._down_ratio)
+        
         print(f"📞 AudioAdapter: {sample_rate}Hz → 24kHz (SIP frame: {self.pcm16_frame_size_sip} bytes)")
         
         # Queues for audio data (all at SIP sample rate)
@@ -28,13 +82,30 @@ class AudioAdapter:
         
         # Downlink buffer for variable-size AI chunks
         self.downlink_buffer: bytearray = bytearray()
+        
+        # Rate-limited warnings for the 20ms audio path
+        self._warn = ThrottledLogger(logger)
     
     async def send_uplink(self, pcm16_data: bytes):
         """Send audio data to AI (uplink) - expects 8kHz PCM16."""
         await self.uplink_queue.put(pcm16_data)
     
+    def _fit_frame(self, audio_sip: bytes) -> bytes:
+        """Pad or truncate an uplink chunk to exactly one SIP frame."""
+        expected_size = self.pcm16_frame_size_sip
+        if len(audio_sip) == expected_size:
+            return audio_sip
+        self._warn.warning("⚠️  Unexpected frame size: expected %d bytes, got %d", expected_size, len(audio_sip))
+        if len(audio_sip) < expected_size:
+            return audio_sip + b'\x00' * (expected_size - len(audio_sip))
+        return audio_sip[:expected_size]
+    
     async def get_uplink(self) -> bytes:
-        """Get audio data for AI (uplink) - resamples SIP rate to 24kHz using scipy."""
+        """Get audio data for AI (uplink) - resamples SIP rate to 24kHz using scipy.
+        
+        Returns one 20ms frame normally, or up to UPLINK_MAX_BATCH frames when a backlog is queued.
+        Resampled audio is returned as a bytes-like memoryview rather than a copied bytes object.
+        """
         try:
             # Wait for audio data with timeout to maintain timing
             # This ensures we get data when available, but don't block too long
@@ -42,59 +113,56 @@ class AudioAdapter:
                 audio_sip = await asyncio.wait_for(self.uplink_queue.get(), timeout=0.02)
             except asyncio.TimeoutError:
                 # Return silence if no data available (maintains continuous stream)
-                return b'\x00' * self.pcm16_frame_size_24k
+                return self.silence_24k
             
-            # Verify frame size
-            expected_size = self.pcm16_frame_size_sip
-            if len(audio_sip) != expected_size:
-                print(f"⚠️  Unexpected frame size: expected {expected_size} bytes, got {len(audio_sip)}")
-                # Pad or truncate to expected size
-                if len(audio_sip) < expected_size:
-                    audio_sip = audio_sip + b'\x00' * (expected_size - len(audio_sip))
-                else:
-                    audio_sip = audio_sip[:expected_size]
+            # Drain any backlog so it is resampled in one call instead of one call per 20ms frame
+            frames = [self._fit_frame(audio_sip)]
+            while len(frames) < UPLINK_MAX_BATCH:
+                try:
+                    frames.append(self._fit_frame(self.uplink_queue.get_nowait()))
+                except asyncio.QueueEmpty:
+                    break
+            audio_sip = frames[0] if len(frames) == 1 else b"".join(frames)
             
-            # Resample SIP sample rate to 24kHz using scipy.signal.resample
-            samples_sip = np.frombuffer(audio_sip, dtype=np.int16).astype(np.float32) / 32768.0
-            num_samples_24k = int(len(samples_sip) * OPENAI_SAMPLE_RATE / self.sip_sample_rate)
-            samples_24k = signal.resample(samples_sip, num_samples_24k)
+            # Silence resamples to silence - skip the filter entirely
+            if all(frame == self.silence_sip for frame in frames):
+                return self.silence_24k * len(frames)
             
-            # Convert back to int16
-            audio_24k = (np.clip(samples_24k, -1.0, 1.0) * 32767.0).astype(np.int16).tobytes()
-            
-            # Verify output size
-            if len(audio_24k) != self.pcm16_frame_size_24k:
-                print(f"⚠️  Resampling output size: expected {self.pcm16_frame_size_24k} bytes, got {len(audio_24k)}")
-                # Pad or truncate to expected size
-                if len(audio_24k) < self.pcm16_frame_size_24k:
-                    audio_24k = audio_24k + b'\x00' * (self.pcm16_frame_size_24k - len(audio_24k))
-                else:
-                    audio_24k = audio_24k[:self.pcm16_frame_size_24k]
-            
-            return audio_24k
+            # Resample SIP sample rate to 24kHz with the precomputed polyphase FIR
+            audio_24k = await asyncio.get_running_loop().run_in_executor(
+                _RESAMPLE_POOL, _resample_pcm16, audio_sip, self._up_ratio, self._up_kernel
+            )
         except Exception as e:
-            print(f"⚠️  Error in get_uplink: {e}")
+            self._warn.warning("⚠️  Error in get_uplink: %s", e, exc_info=True)
             # Return silence on error to maintain stream
-            return b'\x00' * self.pcm16_frame_size_24k
+            return self.silence_24k
+        
+        # Integer-ratio polyphase resampling of full frames is exact - only checked in debug runs
+        # (outside the try above, so a mismatch fails loudly instead of turning into silence)
+        assert len(audio_24k) == self.pcm16_frame_size_24k * len(frames), "resampled frame size mismatch"
+        
+        return audio_24k
     
     async def send_downlink(self, pcm16_data: bytes):
         """Send audio data from AI (downlink) - expects 24kHz PCM16, resamples to SIP rate."""
-        # Resample 24kHz to SIP sample rate using scipy.signal.resample
-        samples_24k = np.frombuffer(pcm16_data, dtype=np.int16).astype(np.float32) / 32768.0
-        num_samples_sip = int(len(samples_24k) * self.sip_sample_rate / OPENAI_SAMPLE_RATE)
-        samples_sip = signal.resample(samples_24k, num_samples_sip)
-        
-        # Convert back to int16
-        audio_sip = (np.clip(samples_sip, -1.0, 1.0) * 32767.0).astype(np.int16).tobytes()
+        # Resample 24kHz to SIP sample rate with the precomputed polyphase FIR
+        audio_sip = await asyncio.get_running_loop().run_in_executor(
+            _RESAMPLE_POOL, _resample_pcm16, pcm16_data, self._down_ratio, self._down_kernel
+        )
         
         # Accumulate and split to fixed SIP rate frames
         self.downlink_buffer.extend(audio_sip)
         
         # Split into fixed-size frames (SIP rate: X bytes per 20ms)
-        while len(self.downlink_buffer) >= self.pcm16_frame_size_sip:
-            frame = bytes(self.downlink_buffer[:self.pcm16_frame_size_sip])
-            self.downlink_buffer = self.downlink_buffer[self.pcm16_frame_size_sip:]
-            await self.downlink_queue.put(frame)
+        # Walk by offset and trim the consumed prefix once, instead of reallocating the buffer per frame
+        frame_size = self.pcm16_frame_size_sip
+        buf = self.downlink_buffer
+        consumed = 0
+        while len(buf) - consumed >= frame_size:
+            self.downlink_queue.put_nowait(bytes(buf[consumed:consumed + frame_size]))
+            consumed += frame_size
+        if consumed:
+            del buf[:consumed]
     
     async def get_downlink(self) -> bytes:
         """Get audio data for SIP (downlink) - returns PCM16 at SIP sample rate."""
@@ -104,11 +172,11 @@ class AudioAdapter:
                 return await asyncio.wait_for(self.downlink_queue.get(), timeout=0.02)
             except asyncio.TimeoutError:
                 # Return silence if no data available (maintains continuous stream)
-                return b'\x00' * self.pcm16_frame_size_sip
+                return self.silence_sip
         except Exception as e:
-            print(f"⚠️  Error in get_downlink: {e}")
+            self._warn.warning("⚠️  Error in get_downlink: %s", e, exc_info=True)
             # Return silence on error to maintain stream
-            return b'\x00' * self.pcm16_frame_size_sip
+            return self.silence_sip
     
     def clear_buffers(self):
         """Clear all audio buffers."""
@@ -124,4 +192,4 @@ class AudioAdapter:
             except asyncio.QueueEmpty:
                 break
         
-        self.downlink_buffer = bytearray()
+        self.downlink_buffer.clear()
@@ -1,16 +1,19 @@
 """Call session management."""
 import asyncio
-import time
+import logging
 import threading
+import traceback
 import concurrent.futures
 from typing import Dict, Any, Optional
 from app.config import Config
-from app.bridge.audio_adapter import AudioAdapter
+from app.bridge.audio_adapter import AudioAdapter, UPLINK_MAX_BATCH
+from app.sip.call_info import CallInfo
 from app.ai.openai_client import OpenAIRealtimeClient
 from app.ai.tool_handler import ToolHandler
 from app.homeassistant.client import HomeAssistantClient
 from app.utils.pin_verification import PINVerifier
 from app.utils.caller_mapping import get_caller_settings
+from app.utils.throttled_log import ThrottledLogger
 
 # Try to import PJSIP call object
 try:
@@ -20,6 +23,8 @@ except ImportError:
     PJSIP_AVAILABLE = False
     pj = None
 
+logger = logging.getLogger(__name__)
+
 
 class PJSIPThreadPool:
     """Thread pool with PJSIP-registered threads."""
@@ -75,12 +80,16 @@ class PJSIPThreadPool:
 class CallSession:
     """Manages a single call session from SIP to AI."""
     
+    # Audio pacing - PJSIP frames are 20ms of 8kHz PCM16
+    FRAME_INTERVAL = 0.02
+    PCM16_FRAME_BYTES = 320
+    
     def __init__(
         self,
         config: Config,
         call_id: str,
         caller_id: str,
-        call_info: Dict[str, Any],
+        call_info: CallInfo,
     ):
         self.config = config
         self.call_id = call_id
@@ -94,11 +103,11 @@ class CallSession:
         self.available_tools = caller_settings["available_tools"]
         
         # Get sample rate from call info (default 8kHz)
-        sample_rate = int(self.call_info.get("sample_rate", 8000))
+        sample_rate = int(self.call_info.sample_rate)
         
         # Components
         self.audio_adapter = AudioAdapter(sample_rate=sample_rate)
-        self.pjsip_call = call_info.get("pjsip_call") if PJSIP_AVAILABLE else None
+        self.pjsip_call = call_info.pjsip_call if PJSIP_AVAILABLE else None
         self.ai_client: Optional[OpenAIRealtimeClient] = None
         self.ha_client: Optional[HomeAssistantClient] = None
         self.tool_handler: Optional[ToolHandler] = None
@@ -109,6 +118,11 @@ class CallSession:
         self.downlink_task: Optional[asyncio.Task] = None
         self.ai_receive_task: Optional[asyncio.Task] = None
         self.running = False
+        self._stop_event = asyncio.Event()
+        self._audio_chunk_count = 0
+        
+        # Rate-limited warnings for the audio loops
+        self._warn = ThrottledLogger(logger)
         
         # Transcription buffer for PIN verification
         self.transcription_buffer: str = ""
@@ -233,7 +247,6 @@ class CallSession:
                         print("✅ Audio bridge ready")
             except Exception as e:
                 print(f"❌ Error answering call: {e}")
-                import traceback
                 traceback.print_exc()
         
         # Trigger OpenAI to start the conversation (instructions will guide the welcome message)
@@ -248,9 +261,19 @@ class CallSession:
         self.downlink_task = asyncio.create_task(self._downlink_loop())
         self.ai_receive_task = asyncio.create_task(self._ai_receive_loop())
     
+    def _end(self):
+        """Mark the session as ended from within (wakes wait_until_ended; stop() still cleans up)."""
+        self.running = False
+        self._stop_event.set()
+    
+    async def wait_until_ended(self):
+        """Wait until the session stops, via stop() or because it ended on its own."""
+        await self._stop_event.wait()
+    
     async def stop(self):
         """Stop the call session."""
         self.running = False
+        self._stop_event.set()
         
         # Stop tasks
         if self.uplink_task:
@@ -308,7 +331,6 @@ class CallSession:
                     print("✅ Hung up PJSIP call")
             except Exception as e:
                 print(f"⚠️  Error hanging up call: {e}")
-                import traceback
                 traceback.print_exc()
         
         if self.ai_client:
@@ -418,33 +440,41 @@ IMPORTANT: Some tools require PIN authentication. When calling a tool that requi
         Loop: Read from PJSIP call, convert via AudioAdapter, send to OpenAI.
         Using AudioAdapter which worked in the original implementation.
         """
-        frame_interval = 0.02  # 20ms
+        frame_interval = self.FRAME_INTERVAL
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
         
         while self.running:
             try:
-                loop_start = time.time()
-                
                 # Read audio from PJSIP call
                 # PJSIP provides PCM16 at 8kHz (320 bytes = 20ms)
                 if self.pjsip_call:
                     try:
-                        # Direct queue access - queue operations are thread-safe and don't call PJSIP
-                        audio_pcm16 = self.pjsip_call.get_audio_frame(blocking=False)
-                        
-                        if audio_pcm16 and len(audio_pcm16) == 320:
+                        # Direct frame-ring access - lock-free SPSC, doesn't call PJSIP
+                        # Wait on the loop (not the thread) for the first frame, so a frame arriving
+                        # a few ms late is not replaced by silence; the deadline below keeps 20ms pacing
+                        audio_pcm16 = await self.pjsip_call.get_audio_frame_async(timeout=frame_interval / 2)
+                        # Drain frames that piled up since the last tick so the adapter can batch them
+                        received = 0
+                        while audio_pcm16 and len(audio_pcm16) == self.PCM16_FRAME_BYTES:
                             # PJSIP already provides PCM16, so send directly to adapter
                             await self.audio_adapter.send_uplink(audio_pcm16)
-                        else:
+                            received += 1
+                            if received >= UPLINK_MAX_BATCH:
+                                break
+                            audio_pcm16 = self.pjsip_call.get_audio_frame(blocking=False)
+                        
+                        if not received:
                             # Send silence if no audio
-                            await self.audio_adapter.send_uplink(b'\x00' * 320)
+                            await self.audio_adapter.send_uplink(self.audio_adapter.silence_sip)
                     except Exception as e:
                         # Call might have ended
-                        print(f"⚠️  Error reading audio from call: {e}")
-                        self.running = False
+                        logger.warning("⚠️  Error reading audio from call: %s", e)
+                        self._end()
                         break
                 else:
                     # No pjsip_call, send silence
-                    await self.audio_adapter.send_uplink(b'\x00' * 320)
+                    await self.audio_adapter.send_uplink(self.audio_adapter.silence_sip)
                 
                 # Get audio data from adapter (resampled to 24kHz)
                 audio_data = await self.audio_adapter.get_uplink()
@@ -452,18 +482,19 @@ IMPORTANT: Some tools require PIN authentication. When calling a tool that requi
                 # Send to OpenAI (even if silence, to maintain continuous stream)
                 await self.ai_client.send_audio(audio_data)
                 
-                # Maintain precise 20ms frame timing
-                elapsed = time.time() - loop_start
-                sleep_time = max(0, frame_interval - elapsed)
+                # Maintain precise 20ms frame timing against an absolute monotonic deadline (no drift)
+                deadline += frame_interval
+                sleep_time = deadline - loop.time()
                 if sleep_time > 0:
                     await asyncio.sleep(sleep_time)
+                elif sleep_time < -frame_interval:
+                    # Fell more than a frame behind - resync instead of bursting to catch up
+                    deadline = loop.time()
                 
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                print(f"❌ Error in uplink loop: {e}")
-                import traceback
-                traceback.print_exc()
+                self._warn.warning("❌ Error in uplink loop: %s", e, exc_info=True)
                 await asyncio.sleep(0.01)
     
     async def _downlink_loop(self):
@@ -471,45 +502,43 @@ IMPORTANT: Some tools require PIN authentication. When calling a tool that requi
         Loop: Read from AudioAdapter, write PCM16 to PJSIP call.
         Using AudioAdapter which worked in the original implementation.
         """
-        frame_interval = 0.02  # 20ms
+        frame_interval = self.FRAME_INTERVAL
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
         
         while self.running:
             try:
-                loop_start = time.time()
-                
                 # Get audio from adapter (already at 8kHz PCM16, 320 bytes = 20ms)
                 pcm16_data = await self.audio_adapter.get_downlink()
                 
-                if self.pjsip_call and pcm16_data and len(pcm16_data) == 320:
+                if self.pjsip_call and pcm16_data and len(pcm16_data) == self.PCM16_FRAME_BYTES:
                     try:
-                        # Direct queue access - queue operations are thread-safe and don't call PJSIP
+                        # Direct frame-ring access - lock-free SPSC, doesn't call PJSIP
                         # PJSIP expects PCM16, so we can send directly
                         self.pjsip_call.put_audio_frame(pcm16_data)
                     except Exception as e:
-                        print(f"⚠️  Error writing audio: {e}")
-                        import traceback
-                        traceback.print_exc()
+                        self._warn.warning("⚠️  Error writing audio: %s", e, exc_info=True)
                 
-                # Maintain precise 20ms frame timing
-                elapsed = time.time() - loop_start
-                sleep_time = max(0, frame_interval - elapsed)
+                # Maintain precise 20ms frame timing against an absolute monotonic deadline (no drift)
+                deadline += frame_interval
+                sleep_time = deadline - loop.time()
                 if sleep_time > 0:
                     await asyncio.sleep(sleep_time)
+                elif sleep_time < -frame_interval:
+                    # Fell more than a frame behind - resync instead of bursting to catch up
+                    deadline = loop.time()
                 
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                print(f"❌ Error in downlink loop: {e}")
-                import traceback
-                traceback.print_exc()
+                self._warn.warning("❌ Error in downlink loop: %s", e, exc_info=True)
                 await asyncio.sleep(0.01)
     
     async def _ai_receive_loop(self):
         """Loop: Receive from OpenAI (handled by callback)."""
         # The actual receiving is handled by OpenAI client callbacks
-        # This task just keeps the loop alive
-        while self.running:
-            await asyncio.sleep(1)
+        # This task just parks until stop() signals, without periodic wakeups
+        await self._stop_event.wait()
     
     async def _handle_ai_audio(self, audio_data: bytes):
         """Handle audio received from OpenAI - send to AudioAdapter."""
@@ -518,12 +547,10 @@ IMPORTANT: Some tools require PIN authentication. When calling a tool that requi
             # AI stopped speaking (might be interrupted) - don't queue audio
             return
         
-        # Debug: Log audio chunks
-        if not hasattr(self, '_audio_chunk_count'):
-            self._audio_chunk_count = 0
+        # Debug: Log audio chunks (skipped entirely unless DEBUG is enabled)
         self._audio_chunk_count += 1
-        if self._audio_chunk_count % 50 == 0 or self._audio_chunk_count <= 5:
-            print(f"🎤 Received from OpenAI: {len(audio_data)} bytes (chunk #{self._audio_chunk_count})")
+        if logger.isEnabledFor(logging.DEBUG) and (self._audio_chunk_count % 50 == 0 or self._audio_chunk_count <= 5):
+            logger.debug("🎤 Received from OpenAI: %d bytes (chunk #%d)", len(audio_data), self._audio_chunk_count)
         
         # Send to audio adapter for downlink (will resample to 8kHz)
         await self.audio_adapter.send_downlink(audio_data)
@@ -585,7 +612,6 @@ IMPORTANT: Some tools require PIN authentication. When calling a tool that requi
                 })
         except Exception as e:
             print(f"❌ Error handling tool call: {e}")
-            import traceback
             traceback.print_exc()
             await self.ai_client.submit_tool_output(tool_call_id, {
                 "success": False,
@@ -1,27 +1,38 @@
 """Configuration loading and management."""
 import os
 import json
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, Any, Optional
-import yaml
-from dotenv import load_dotenv
 
 
+def caller_id_variant(caller_id: str) -> str:
+    """Return the +/no-+ counterpart of a caller ID ("+49123" <-> "49123")."""
+    return caller_id[1:] if caller_id.startswith("+") else f"+{caller_id}"
+
+
+@dataclass(slots=True, eq=False)
 class Config:
     """Configuration manager for addon and standalone modes."""
     
-    def __init__(self):
+    is_addon_mode: bool = field(init=False)
+    config: Dict[str, Any] = field(default_factory=dict, repr=False)  # Holds credentials - keep out of repr
+    callers: Dict[str, Any] = field(default_factory=dict, repr=False)  # Holds caller PINs - keep out of repr
+    profiles: Dict[str, Any] = field(default_factory=dict)
+    tools: Dict[str, Any] = field(default_factory=dict)
+    _pins: Dict[str, Optional[int]] = field(default_factory=dict, init=False, repr=False)  # caller_id (incl. +/no-+ variants) -> PIN
+    _version: int = field(default=0, init=False, repr=False)  # Bumped on every load() to invalidate derived caches
+    
+    def __post_init__(self):
         self.is_addon_mode = os.path.exists("/data/options.json")
-        self.config: Dict[str, Any] = {}
-        self.callers: Dict[str, Any] = {}
-        self.profiles: Dict[str, Any] = {}
-        self.tools: Dict[str, Any] = {}
         
         # Load .env file in standalone mode
         if not self.is_addon_mode:
             # Try to load .env from current working directory (ha_sip_voice_assistant/)
             env_path = Path(".env")
             if env_path.exists():
+                # Imported lazily: dotenv is only needed in standalone mode
+                from dotenv import load_dotenv
                 load_dotenv(env_path)
                 print(f"✅ Loaded .env from {env_path.absolute()}")
             else:
@@ -42,6 +53,13 @@ class Config:
         self._load_yaml_config(caller_config_path, "callers")
         self._load_yaml_config(profiles_config_path, "profiles")
         self._load_yaml_config(tools_config_path, "tools")
+        
+        self._version += 1
+    
+    @property
+    def version(self) -> int:
+        """Number of times load() has run (cache key for settings derived from the config)."""
+        return self._version
     
     def _load_addon_config(self):
         """Load configuration from Home Assistant addon options."""
@@ -77,6 +95,7 @@ class Config:
             "sip_transport": os.getenv("SIP_TRANSPORT", "udp"),
             "sip_port": sip_port,  # Server port (where FritzBox listens, typically 5060)
             "sip_bind_port": sip_bind_port,  # Bind port (where we listen, can be any port)
+            "sip_local_ip": os.getenv("SIP_LOCAL_IP", ""),  # Advertised local IP (empty = auto-detect)
             "openai_api_key": os.getenv("OPENAI_API_KEY", ""),
             "openai_model": os.getenv("OPENAI_MODEL", "gpt-realtime"),
             "homeassistant_url": os.getenv("HOMEASSISTANT_URL", "http://localhost:8123"),
@@ -88,20 +107,29 @@ class Config:
     
     def _load_yaml_config(self, config_path: str, key: str):
         """Load YAML configuration file."""
-        path = Path(config_path)
-        if not path.exists():
+        # Open directly instead of stat-ing first: one syscall per candidate path
+        try:
+            f = open(config_path, "r")
+        except FileNotFoundError:
             # Try relative to project root
-            path = Path(__file__).parent.parent / config_path
+            try:
+                f = open(Path(__file__).parent.parent / config_path, "r")
+            except FileNotFoundError:
+                return
+        
+        # Imported lazily to keep startup import time down
+        import yaml
         
-        if path.exists():
-            with open(path, "r") as f:
-                data = yaml.safe_load(f)
-                if key == "callers":
-                    self.callers = data.get("callers", {})
-                elif key == "profiles":
-                    self.profiles = data.get("profiles", {})
-                elif key == "tools":
-                    self.tools = data.get("tools", {})
+        with f:
+            data = yaml.safe_load(f)
+            if key == "callers":
+                # Unquoted numeric keys (491234567:) load as int from YAML - caller IDs are strings
+                self.callers = {str(caller_id): caller for caller_id, caller in (data.get("callers") or {}).items()}
+                self._build_pin_index()
+            elif key == "profiles":
+                self.profiles = data.get("profiles", {})
+            elif key == "tools":
+                self.tools = data.get("tools", {})
     
     def get_sip_config(self) -> Dict[str, Any]:
         """Get SIP configuration."""
@@ -116,6 +144,7 @@ class Config:
             "transport": self.config["sip_transport"],
             "port": self.config["sip_port"],  # Server port (where to send REGISTER to)
             "bind_port": self.config.get("sip_bind_port", self.config["sip_port"]),  # Bind port (where we listen)
+            "local_ip": self.config.get("sip_local_ip") or None,  # None = auto-detect
         }
     
     def get_openai_config(self) -> Dict[str, Any]:
@@ -171,21 +200,23 @@ class Config:
         """Get the default profile configuration."""
         return self.profiles.get("default")
     
+    def _build_pin_index(self):
+        """Resolve caller PINs once so get_pin() is a plain dict lookup."""
+        pins: Dict[str, Optional[int]] = {}
+        for caller_id, caller_config in self.callers.items():
+            pin = caller_config.get("pin") if caller_config else None
+            # None if pin is explicitly null, not set or not a valid number
+            try:
+                pins[caller_id] = int(pin) if pin not in (None, "null") else None
+            except (ValueError, TypeError):
+                pins[caller_id] = None
+        
+        # Also index the +/no-+ variants matched by get_caller_config (exact keys win)
+        for caller_id in list(pins.keys()):
+            pins.setdefault(caller_id_variant(caller_id), pins[caller_id])
+        
+        self._pins = pins
+    
     def get_pin(self, caller_id: str) -> Optional[int]:
         """Get PIN for a caller from callers.yaml. Returns None if no PIN is configured."""
-        # Get caller config
-        caller_config = self.get_caller_config(caller_id)
-        if caller_config:
-            pin = caller_config.get("pin")
-            # Return None if pin is explicitly null or not set
-            if pin is not None and pin != "null":
-                # Convert to int (handles both string and int from YAML)
-                try:
-                    return int(pin)
-                except (ValueError, TypeError):
-                    # Invalid PIN format - return None
-                    return None
-        
-        # No PIN configured for this caller - return None
-        return None
-
+        return self._pins.get(caller_id)
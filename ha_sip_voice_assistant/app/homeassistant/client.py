@@ -1,12 +1,17 @@
 """Home Assistant REST API client."""
+import logging
 import aiohttp
 from typing import Dict, Any, Optional
 from app.config import Config
 
+logger = logging.getLogger(__name__)
+
 
 class HomeAssistantClient:
     """Client for calling Home Assistant services."""
     
+    __slots__ = ("url", "token", "session")
+    
     def __init__(self, config: Config):
         ha_config = config.get_homeassistant_config()
         self.url = ha_config["url"].rstrip('/')
@@ -61,9 +66,10 @@ class HomeAssistantClient:
         if entity_id:
             service_data["entity_id"] = entity_id
         
-        print(f"🔧 Calling HA service: {url}")
-        print(f"🔧 Service data: {service_data}")
-        print(f"🔧 Authorization header present: {bool(self.token)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🔧 Calling HA service: %s", url)
+            logger.debug("🔧 Service data: %s", service_data)
+            logger.debug("🔧 Authorization header present: %s", bool(self.token))
         
         async with self.session.post(url, json=service_data) as response:
             if response.status == 401:
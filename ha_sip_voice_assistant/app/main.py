@@ -1,17 +1,35 @@
 """Main entry point for the application."""
 import asyncio
+import logging
+import logging.handlers
+import queue
 import signal
 import sys
+import traceback
 import argparse
-from typing import Dict, Any, Optional
+from typing import Dict, Optional
 from app.config import Config
 from app.sip.pjsip_adapter import PJSIPAdapter
 from app.bridge.call_session import CallSession
+from app.sip.call_info import CallInfo
+from app.utils.caller_mapping import warm_caller_settings
 
 
 class Application:
     """Main application class."""
     
+    __slots__ = (
+        "config",
+        "sip_client",
+        "active_sessions",
+        "running",
+        "_shutdown_requested",
+        "_stopping",
+        "_loop",
+        "_shutdown_event",
+        "registered_event",
+    )
+    
     def __init__(self):
         self.config = Config()
         self.sip_client: Optional[PJSIPAdapter] = None
@@ -20,6 +38,8 @@ class Application:
         self._shutdown_requested = False
         self._stopping = False
         self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._shutdown_event = asyncio.Event()
+        self.registered_event = asyncio.Event()  # Set once the SIP client is registered
         
         # Setup signal handlers
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -29,15 +49,13 @@ class Application:
         """Handle shutdown signals."""
         print(f"Received signal {signum}, shutting down...")
         # Signal handlers must be fast and synchronous
-        # Just set a flag - the main loop will check this
+        # Set the flags and wake the main task waiting on the shutdown event
         self._shutdown_requested = True
         self.running = False
         
-        # Try to wake up the event loop if it's sleeping
         if self._loop is not None and self._loop.is_running():
             try:
-                # Schedule a no-op callback to wake up the loop
-                self._loop.call_soon_threadsafe(lambda: None)
+                self._loop.call_soon_threadsafe(self._shutdown_event.set)
             except RuntimeError:
                 pass  # Loop might be closing
     
@@ -48,6 +66,8 @@ class Application:
         
         print("Loading configuration...")
         self.config.load()
+        # Resolve profiles and render instructions now instead of during call setup
+        warm_caller_settings(self.config)
         
         print("Starting SIP client (PJSIP)...")
         sip_config = self.config.get_sip_config()
@@ -61,7 +81,9 @@ class Application:
             port=sip_config["port"],  # Server port (where FritzBox listens)
             bind_port=sip_config.get("bind_port"),  # Bind port (where we listen locally)
             on_incoming_call=self._handle_incoming_call,
+            local_ip=sip_config.get("local_ip"),  # Optional: skip local IP discovery
         )
+        self.sip_client.on_registered = self.registered_event.set
         
         await self.sip_client.start()
         self.running = True
@@ -69,17 +91,16 @@ class Application:
         print("SIP client (PJSIP) started. Waiting for calls...")
         print(f"Registered as: {sip_config['username']}@{sip_config['server']}")
         
-        # Wait a moment to see registration result
-        await asyncio.sleep(2)
+        # start() has already waited for the registration result
         if self.sip_client.registered:
             print("✅ SIP registration confirmed and ready for calls")
         else:
             print("⚠️  SIP registration status: waiting for response...")
         
-        # Keep running
+        # Keep running until a shutdown is requested (no periodic wakeups)
         try:
-            while self.running and not self._shutdown_requested:
-                await asyncio.sleep(1)
+            if not self._shutdown_requested:
+                await self._shutdown_event.wait()
             
             # If we exit the loop due to shutdown, call stop()
             if self._shutdown_requested:
@@ -97,6 +118,7 @@ class Application:
         print("Stopping application...")
         self.running = False
         self._shutdown_requested = True
+        self._shutdown_event.set()
         
         # Stop all active sessions
         for session in list(self.active_sessions.values()):
@@ -109,11 +131,10 @@ class Application:
         
         print("Application stopped.")
     
-    async def _handle_incoming_call(self, caller_id: str, call_info: Dict[str, Any]):
+    async def _handle_incoming_call(self, caller_id: str, call_info: CallInfo):
         """Handle an incoming call."""
-        call_id = call_info.get("call_id", "unknown")
+        call_id = call_info.call_id
         print(f"📞 Incoming call from {caller_id} (Call-ID: {call_id})")
-        print(f"   Call info keys: {list(call_info.keys())}")
         print(f"   Active calls: {list(self.sip_client.active_calls.keys())}")
         
         # Check immediately - call should already be in active_calls
@@ -121,12 +142,7 @@ class Application:
         if not call_info_full:
             print(f"❌ Call {call_id} not found in active_calls!")
             print(f"   Available call IDs: {list(self.sip_client.active_calls.keys())}")
-            # Try to use the call_info directly if it has all needed data
-            if "rtp_info" in call_info and "local_rtp_port" in call_info:
-                print(f"   Using call_info directly (has RTP info)")
-                call_info_full = call_info
-            else:
-                return
+            return
         
         # Create call session
         session = CallSession(
@@ -142,30 +158,48 @@ class Application:
             await session.start()
             print(f"✅ Call session {call_id} started")
             
-            # Wait for call to end
-            # With pyVoIP, the call session manages its own lifecycle
-            # Monitor the session's running state
-            while session.running:
-                await asyncio.sleep(0.5)  # Check more frequently
+            # Wait for the caller to hang up, or for the session to end on its own
+            # (e.g. call audio failed) - session.stop() below then hangs up
+            call_ended = asyncio.create_task(self.sip_client.wait_for_call_end(call_id))
+            session_ended = asyncio.create_task(session.wait_until_ended())
+            try:
+                await asyncio.wait({call_ended, session_ended}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                call_ended.cancel()
+                session_ended.cancel()
             
             print(f"📞 Call {call_id} ended")
         except Exception as e:
             print(f"❌ Error in call session {call_id}: {e}")
-            import traceback
             traceback.print_exc()
         finally:
             await session.stop()
             self.active_sessions.pop(call_id, None)
             
             # Now remove from active_calls after session is stopped
-            if call_id in self.sip_client.active_calls:
-                del self.sip_client.active_calls[call_id]
+            if self.sip_client.remove_call(call_id) is not None:
                 print(f"🧹 Cleaned up call {call_id} from active_calls")
             
             # Schedule registration refresh now that call is fully cleaned up
             self.sip_client._schedule_refresh_after_call()
 
 
+def setup_logging() -> logging.handlers.QueueListener:
+    """Route log records through a queue so console I/O happens off the event loop thread."""
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    
+    # Plain message format so logged lines read like the rest of the console output
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(message)s",
+        handlers=[logging.handlers.QueueHandler(log_queue)],
+    )
+    # stdout, like the print() output, so logged and printed lines share one stream
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+    listener.start()
+    return listener
+
+
 async def main(dry_run: bool = False):
     """Main entry point."""
     if dry_run:
@@ -201,7 +235,6 @@ async def main(dry_run: bool = False):
             return
         except Exception as e:
             print(f"❌ Configuration error: {e}")
-            import traceback
             traceback.print_exc()
             sys.exit(1)
     
@@ -218,9 +251,14 @@ if __name__ == "__main__":
     )
     args = parser.parse_args()
     
+    log_listener = setup_logging()
+    
     try:
         asyncio.run(main(dry_run=args.dry_run))
     except KeyboardInterrupt:
         print("\nShutting down...")
         sys.exit(0)
+    finally:
+        # Flush queued log records before exiting
+        log_listener.stop()
 
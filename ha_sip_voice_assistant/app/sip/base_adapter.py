@@ -0,0 +1,159 @@
+"""Shared scaffolding for the SIP backend adapters."""
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Callable, Awaitable, Set
+from app.sip.call_info import CallInfo, track_call
+from app.sip.net_utils import get_local_ip
+
+logger = logging.getLogger(__name__)
+
+
+class BaseSIPAdapter:
+    """Common state and call bookkeeping for PJSIPAdapter and PyVoIPAdapter.
+
+    Subclasses run their SIP stack in a separate thread and call
+    _bridge_incoming_call() from it for every new call.
+    """
+
+    def __init__(
+        self,
+        server: str,
+        username: str,
+        password: str,
+        display_name: str = "HA Voice Assistant",
+        transport: str = "udp",
+        port: int = 5060,
+        bind_port: Optional[int] = None,
+        on_incoming_call: Optional[Callable[[str, CallInfo], Awaitable[None]]] = None,
+        local_ip: Optional[str] = None,
+    ):
+        self.server = server
+        self.username = username
+        self.password = password
+        self.display_name = display_name
+        self.transport = transport
+        self.server_port = port
+        self.local_port = bind_port if bind_port is not None else port
+        self.on_incoming_call = on_incoming_call
+
+        # Local IP: use the configured address, only probe the network when unset
+        self.configured_local_ip = local_ip  # Also advertised in SIP headers by the backend
+        self.local_ip = local_ip or self._get_local_ip()
+
+        # Running state
+        self.running = False
+        self.registered = False
+        self.on_registered: Optional[Callable[[], None]] = None  # Called on the event loop once registered
+        self._registered_event = asyncio.Event()  # Set on the event loop alongside on_registered
+
+        # Active calls tracking (written from the SIP thread and the asyncio thread)
+        self.active_calls: "OrderedDict[str, CallInfo]" = OrderedDict()
+        self.calls_lock = threading.Lock()
+
+        # Event loop reference for callbacks
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        # Strong references to callback tasks (the loop only keeps weak ones)
+        self._callback_tasks: Set[asyncio.Task] = set()
+
+    def _get_local_ip(self) -> str:
+        """Get local IP address (cached per server for the whole process)."""
+        return get_local_ip(self.server, self.server_port)
+
+    def _bridge_incoming_call(self, caller_id: str, call_info: CallInfo):
+        """Track a new call and hand it to on_incoming_call (called from the SIP thread)."""
+        # Add to active calls (also read/removed from the asyncio thread)
+        with self.calls_lock:
+            evicted = track_call(self.active_calls, call_info)
+        
+        # Evicted calls are no longer tracked: wake anyone still waiting for them to end
+        if evicted and self.loop:
+            for old_call in evicted:
+                try:
+                    self.loop.call_soon_threadsafe(self._set_call_ended, old_call)
+                except RuntimeError:
+                    pass  # Loop might be closing
+
+        # Bridge to async handler
+        if self.on_incoming_call and self.loop:
+            try:
+                # Fire-and-forget: no concurrent Future needed, just hop onto the loop
+                self.loop.call_soon_threadsafe(
+                    self._spawn_callback,
+                    self.on_incoming_call(caller_id, call_info),
+                )
+            except Exception as e:
+                logger.exception("❌ Error calling async callback: %s", e)
+
+    def _notify_registered(self):
+        """Signal registration on the event loop (safe to call from the SIP thread)."""
+        if self.loop:
+            try:
+                self.loop.call_soon_threadsafe(self._set_registered)
+            except RuntimeError:
+                pass  # Loop might be closing
+    
+    def _set_registered(self):
+        """Wake start() and run on_registered (event loop only)."""
+        self._registered_event.set()
+        if self.on_registered:
+            self.on_registered()
+
+    def _spawn_callback(self, coro):
+        """Run a coroutine as a task on the event loop (called via call_soon_threadsafe)."""
+        task = self.loop.create_task(coro)
+        self._callback_tasks.add(task)
+        task.add_done_callback(self._callback_tasks.discard)
+
+    def get_call_info(self, call_id: str) -> Optional[CallInfo]:
+        """Get information about an active call."""
+        return self.active_calls.get(call_id)
+
+    def remove_call(self, call_id: str) -> Optional[CallInfo]:
+        """Stop tracking a call; returns its info if it was tracked."""
+        with self.calls_lock:
+            return self.active_calls.pop(call_id, None)
+
+    async def wait_for_call_end(self, call_id: str):
+        """Wait until the given call has been disconnected."""
+        call_info = self.active_calls.get(call_id)
+        if not call_info or call_info.ended:
+            return
+        
+        # Created here, on the loop: asyncio futures must not be touched from the SIP thread
+        if call_info.ended_future is None:
+            call_info.ended_future = asyncio.get_running_loop().create_future()
+        # Shielded: a cancelled waiter must not cancel the future shared with other waiters
+        await asyncio.shield(call_info.ended_future)
+    
+    def _resolve_call_ended(self, call_id: str):
+        """Mark a call as ended and wake its waiter (safe to call from the SIP thread)."""
+        call_info = self.active_calls.get(call_id)
+        if not call_info or not self.loop:
+            return
+        
+        try:
+            self.loop.call_soon_threadsafe(self._set_call_ended, call_info)
+        except RuntimeError:
+            pass  # Loop might be closing
+    
+    @staticmethod
+    def _set_call_ended(call_info: CallInfo):
+        """Flag the call as ended and resolve its future, if anyone is waiting (event loop only)."""
+        call_info.ended = True
+        future = call_info.ended_future
+        if future is not None and not future.done():
+            future.set_result(None)
+    
+    def _clear_calls(self):
+        """Forget all tracked calls and release anyone waiting for them to end (used on stop)."""
+        with self.calls_lock:
+            calls = list(self.active_calls.values())
+            self.active_calls.clear()
+        for call_info in calls:
+            self._set_call_ended(call_info)
+
+    def _schedule_refresh_after_call(self):
+        """Schedule registration refresh after call ends (no-op: both backends refresh internally)."""
+        pass
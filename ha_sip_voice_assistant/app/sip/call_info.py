@@ -0,0 +1,44 @@
+"""Per-call state shared between the SIP adapters and the call session."""
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+# Upper bound on tracked calls; main removes finished calls, this only guards
+# against entries leaking if a call never reaches cleanup.
+MAX_TRACKED_CALLS = 64
+
+
+@dataclass(slots=True)
+class CallInfo:
+    """Information about an active call (one instance per entry in active_calls)."""
+
+    call_id: str
+    caller_id: str
+    from_header: str = ""
+    to_header: str = ""
+    remote_ip: str = ""
+    remote_port: int = 0
+    rtp_info: Dict[str, Any] = field(default_factory=dict)
+    sample_rate: int = 8000
+
+    # Backend call objects (only the one for the active adapter is set)
+    pjsip_call: Any = None
+    voip_call: Any = None
+
+    # Set on the event loop when the call disconnects (see wait_for_call_end)
+    ended: bool = False
+    # Created lazily on the event loop by wait_for_call_end, never on the SIP thread
+    ended_future: Optional[asyncio.Future] = field(default=None, repr=False)
+
+
+def track_call(active_calls: "OrderedDict[str, CallInfo]", call_info: CallInfo) -> List[CallInfo]:
+    """Add a call to active_calls, evicting the oldest entries beyond MAX_TRACKED_CALLS.
+    
+    Returns the evicted calls, so the caller can release anyone waiting for them to end.
+    """
+    active_calls[call_info.call_id] = call_info
+    evicted = []
+    while len(active_calls) > MAX_TRACKED_CALLS:
+        evicted.append(active_calls.popitem(last=False)[1])
+    return evicted
@@ -0,0 +1,61 @@
+"""Fixed-size single-producer/single-consumer ring of PCM16 frames."""
+from typing import Optional
+
+
+class SPSCFrameRing:
+    """Lock-free ring buffer for one producer thread and one consumer thread.
+
+    Frames are copied into a preallocated bytearray, so the PJSIP media callback
+    never takes a lock or allocates a queue node. Safety relies on the GIL: the
+    producer only advances ``_tail`` after writing the slot, the consumer only
+    advances ``_head`` after reading it, and each int store is atomic.
+    """
+
+    __slots__ = ("capacity", "frame_size", "_mask", "_buf", "_view", "_head", "_tail")
+
+    def __init__(self, capacity: int, frame_size: int):
+        """Initialize the ring.
+
+        Args:
+            capacity: Number of frame slots (must be a power of two)
+            frame_size: Size of one frame in bytes
+        """
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError(f"capacity must be a power of two, got {capacity}")
+        self.capacity = capacity
+        self.frame_size = frame_size
+        self._mask = capacity - 1
+        self._buf = bytearray(capacity * frame_size)
+        self._view = memoryview(self._buf)
+        # Monotonic counters; slot index is counter & mask
+        self._head = 0  # Next frame to read (written by consumer only)
+        self._tail = 0  # Next slot to write (written by producer only)
+
+    def __len__(self) -> int:
+        return self._tail - self._head
+
+    def try_push(self, data) -> bool:
+        """Copy one frame into the ring (producer side).
+
+        Data longer than frame_size is truncated. Returns False if the ring is
+        full or the data is shorter than one frame.
+        """
+        tail = self._tail
+        if tail - self._head >= self.capacity or len(data) < self.frame_size:
+            return False
+        fs = self.frame_size
+        offset = (tail & self._mask) * fs
+        self._view[offset:offset + fs] = memoryview(data)[:fs]
+        self._tail = tail + 1  # Publish after the slot is written
+        return True
+
+    def try_pop(self) -> Optional[bytes]:
+        """Copy the oldest frame out of the ring (consumer side), or None if empty."""
+        head = self._head
+        if head == self._tail:
+            return None
+        fs = self.frame_size
+        offset = (head & self._mask) * fs
+        frame = self._view[offset:offset + fs].tobytes()
+        self._head = head + 1  # Release the slot after it has been copied
+        return frame
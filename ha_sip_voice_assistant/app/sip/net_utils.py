@@ -0,0 +1,107 @@
+"""Network helpers for the SIP adapters."""
+import socket
+import struct
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Non-Linux platforms
+    fcntl = None
+
+# ioctl request to read an interface's IPv4 address (linux/sockios.h)
+SIOCGIFADDR = 0x8915
+# Route flag: route is usable (linux/route.h)
+RTF_UP = 0x0001
+
+# Discovered local IPs per (target host, port), shared by all adapters in the process
+_LOCAL_IP_CACHE: Dict[Tuple[Optional[str], int], str] = {}
+_LOCAL_IP_LOCK = threading.Lock()
+
+
+def _default_route_interface() -> Optional[str]:
+    """Return the interface carrying the preferred IPv4 default route, from /proc/net/route.
+
+    Several default routes are common on multi-homed hosts (e.g. Wi-Fi and
+    Ethernet): like the kernel, prefer the lowest metric among routes that are up.
+    """
+    best_iface, best_metric = None, None
+    try:
+        with open("/proc/net/route") as f:
+            next(f, None)  # Header line
+            for line in f:
+                # Iface Destination Gateway Flags RefCnt Use Metric Mask ...
+                fields = line.split()
+                # Destination 00000000 is the default route
+                if len(fields) < 7 or fields[1] != "00000000":
+                    continue
+                if not int(fields[3], 16) & RTF_UP:
+                    continue
+                metric = int(fields[6])
+                if best_metric is None or metric < best_metric:
+                    best_iface, best_metric = fields[0], metric
+    except (OSError, ValueError):
+        pass
+    return best_iface
+
+
+def default_route_ip() -> Optional[str]:
+    """Get the IPv4 address of the default-route interface without sending traffic.
+
+    Reads the routing table and asks the kernel for the interface address via
+    SIOCGIFADDR - no connect(), no route lookup towards an external host.
+    Returns None when unavailable (not Linux, no default route, no address).
+    """
+    if fcntl is None:
+        return None
+
+    iface = _default_route_interface()
+    if not iface:
+        return None
+
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            ifreq = fcntl.ioctl(s.fileno(), SIOCGIFADDR, struct.pack("256s", iface[:15].encode()))
+        return socket.inet_ntoa(ifreq[20:24])
+    except OSError:
+        return None
+
+
+def _route_ip(host: str, port: int) -> Optional[str]:
+    """Get the local address the kernel would use to reach host (UDP connect, no traffic)."""
+    try:
+        # Prefer IPv4, then IPv6
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_DGRAM)
+    except OSError:
+        return None
+    infos.sort(key=lambda x: 0 if x[0] == socket.AF_INET else 1)
+    for family, _, _, _, sockaddr in infos:
+        try:
+            with socket.socket(family, socket.SOCK_DGRAM) as s:
+                s.connect(sockaddr)
+                return s.getsockname()[0]
+        except OSError:
+            continue
+    return None
+
+
+def get_local_ip(server: Optional[str] = None, port: int = 5060) -> str:
+    """Get the local IP to advertise in SIP, discovering it at most once per target.
+
+    Order: route towards the SIP server (the kernel's own choice, best for an
+    on-LAN registrar like fritz.box), default-route interface address (routing
+    table + SIOCGIFADDR, no DNS and no connect()), route towards a public host,
+    then 127.0.0.1. A configured sip_local_ip skips this entirely.
+    """
+    key = (server, port)
+    with _LOCAL_IP_LOCK:
+        ip = _LOCAL_IP_CACHE.get(key)
+        if ip is None:
+            ip = (
+                (server and _route_ip(server, port))
+                or default_route_ip()
+                or _route_ip("8.8.8.8", 80)
+                or "127.0.0.1"
+            )
+            _LOCAL_IP_CACHE[key] = ip
+        return ip
@@ -1,10 +1,13 @@
 """Adapter for PJSIP (pjsua2) library to provide async-compatible interface."""
 import asyncio
+import logging
 import threading
-import socket
-import re
-import queue
-from typing import Optional, Callable, Awaitable, Dict, Any
+import warnings
+from typing import Optional
+from app.sip.base_adapter import BaseSIPAdapter
+from app.sip.call_info import CallInfo
+from app.sip.frame_ring import SPSCFrameRing
+from app.sip.uri import extract_caller_id
 
 try:
     import pjsua2 as pj
@@ -13,6 +16,27 @@ except ImportError:
     PJSIP_AVAILABLE = False
     pj = None
 
+logger = logging.getLogger(__name__)
+
+# 20 ms of PCM16 at 8 kHz
+PCM16_FRAME_BYTES = 320
+# Frames buffered per direction (power of two for the ring index mask)
+AUDIO_RING_FRAMES = 16
+# RX backlog (frames) above which the uplink starts discarding; 5 frames = 100 ms
+RX_MAX_BACKLOG_FRAMES = 5
+# Frames returned between two discards, so drops are spread out and not back-to-back
+RX_DISCARD_SPACING = 3
+# PJSIP adaptive jitter buffer targets (ms) for a 40-80 ms mouth-to-ear budget
+JB_INIT_MS = 60
+JB_MIN_PREFETCH_MS = 40
+JB_MAX_PREFETCH_MS = 80
+JB_MAX_MS = 100
+# libHandleEvents timeouts for the PJSIP thread (ms)
+EVENT_POLL_ACTIVE_MS = 10
+EVENT_POLL_IDLE_MS = 200
+# Seconds start() waits for the registrar to accept us
+REGISTRATION_TIMEOUT = 5.0
+
 
 # Note: AudioMediaPort implementation will need to be completed based on actual PJSIP API
 # The exact API depends on pjsua2 version and how AudioMediaPort is exposed
@@ -20,20 +44,22 @@ except ImportError:
 
 
 class QueueAudioPort(pj.AudioMediaPort):
-    """Custom AudioMediaPort that bridges audio to/from Python queues."""
+    """Custom AudioMediaPort that bridges audio to/from Python via frame rings."""
     
-    def __init__(self, rx_queue, tx_queue, sample_rate=8000, frame_size_ms=20):
-        """Initialize port with queues.
+    def __init__(self, rx_ring, tx_ring, sample_rate=8000, frame_size_ms=20, on_rx=None):
+        """Initialize port with frame rings.
         
         Args:
-            rx_queue: Queue for receiving audio (from call)
-            tx_queue: Queue for transmitting audio (to call)
+            rx_ring: SPSCFrameRing for receiving audio (from call)
+            tx_ring: SPSCFrameRing for transmitting audio (to call)
             sample_rate: Sample rate in Hz (default 8000)
             frame_size_ms: Frame size in milliseconds (default 20)
+            on_rx: Optional callable invoked after a frame was stored in rx_ring
         """
         pj.AudioMediaPort.__init__(self)
-        self.rx_queue = rx_queue
-        self.tx_queue = tx_queue
+        self.rx_ring = rx_ring
+        self.tx_ring = tx_ring
+        self.on_rx = on_rx
         self.sample_rate = sample_rate
         self.frame_size_ms = frame_size_ms
         self.frame_size_samples = (sample_rate * frame_size_ms) // 1000
@@ -49,82 +75,79 @@ class QueueAudioPort(pj.AudioMediaPort):
         
         # Create port
         self.createPort("QueueAudioPort", fmt)
+        
+        # Resolve per-frame lookups once: they never change for a given pjsua2 build
+        self._frame_audio_type = pj.PJMEDIA_FRAME_TYPE_AUDIO
+        if hasattr(pj.ByteVector, 'assign_from_bytes'):
+            self._fill = self._assign_fill
+        elif self._slice_assign_works():
+            self._fill = self._slice_fill
+        else:
+            self._fill = self._append_fill
+        # Bulk ByteVector -> bytes copy when the binding provides one, else iterate
+        self._to_bytes = getattr(pj.ByteVector, 'to_bytes', bytes)
+        
+        # Silence frame built once; assigning a ByteVector to frame.buf is a single C++ copy
+        self._silence = bytes(self.frame_size_bytes)
+        self._silence_vec = pj.ByteVector()
+        self._fill(self._silence_vec, self._silence)
+    
+    @staticmethod
+    def _assign_fill(buf, data):
+        """Fill a ByteVector in one call."""
+        buf.assign_from_bytes(data)
+    
+    @staticmethod
+    def _slice_fill(buf, data):
+        """Fill a ByteVector with one SWIG slice assignment (resizes as needed)."""
+        buf[:] = data
+    
+    @staticmethod
+    def _slice_assign_works() -> bool:
+        """Check once whether this pjsua2 build's ByteVector supports slice assignment."""
+        try:
+            probe = pj.ByteVector()
+            probe[:] = b'\x01\x02'
+            return len(probe) == 2 and probe[1] == 2
+        except Exception:
+            return False
+    
+    @staticmethod
+    def _append_fill(buf, data):
+        """Fill a ByteVector byte by byte (older pjsua2 builds without assign_from_bytes)."""
+        buf.clear()
+        for byte_val in data:
+            buf.append(byte_val)
     
     def onFrameReceived(self, frame):
         """Called by PJSIP when a frame is received (RX - uplink from call)."""
         try:
-            # Check if frame is audio type
-            if hasattr(frame, 'type') and frame.type == pj.PJMEDIA_FRAME_TYPE_AUDIO:
-                # Get audio data from frame
-                if hasattr(frame, 'buf') and frame.buf:
-                    # Convert ByteVector to bytes
-                    try:
-                        # ByteVector can be converted to bytes directly
-                        audio_data = bytes(frame.buf) if hasattr(frame.buf, '__iter__') else frame.buf
-                        if audio_data:
-                            # Put audio in queue (non-blocking)
-                            try:
-                                self.rx_queue.put_nowait(audio_data)
-                            except queue.Full:
-                                pass  # Skip if queue is full
-                    except Exception:
-                        # Silently ignore conversion errors
-                        pass
+            buf = frame.buf
+            if frame.type == self._frame_audio_type and buf:
+                audio_data = self._to_bytes(buf)
+                if audio_data:
+                    # Put audio in ring (non-blocking, dropped if full)
+                    if self.rx_ring.try_push(audio_data) and self.on_rx is not None:
+                        self.on_rx()
         except Exception:
             # Silently ignore errors to avoid breaking audio stream
             pass
     
     def onFrameRequested(self, frame):
         """Called by PJSIP when a frame is requested (TX - downlink to call)."""
+        frame.type = self._frame_audio_type
         try:
-            # Set frame type
-            if hasattr(frame, 'type'):
-                frame.type = pj.PJMEDIA_FRAME_TYPE_AUDIO
-            
-            # Get audio from queue (non-blocking)
-            try:
-                audio_data = self.tx_queue.get_nowait()
-                if audio_data and len(audio_data) >= self.frame_size_bytes:
-                    # Fill frame buffer (ByteVector)
-                    audio_bytes = audio_data[:self.frame_size_bytes]
-                    if hasattr(frame, 'buf'):
-                        # Use assign_from_bytes if available, otherwise use append
-                        if hasattr(frame.buf, 'assign_from_bytes'):
-                            frame.buf.assign_from_bytes(audio_bytes)
-                        else:
-                            frame.buf.clear()
-                            for byte_val in audio_bytes:
-                                frame.buf.append(byte_val)
-                    # Set frame size
-                    if hasattr(frame, 'size'):
-                        frame.size = len(audio_bytes)
-                    return
-            except queue.Empty:
-                pass
-            
-            # Return silence if queue is empty
-            silence = b'\x00' * self.frame_size_bytes
-            if hasattr(frame, 'buf'):
-                if hasattr(frame.buf, 'assign_from_bytes'):
-                    frame.buf.assign_from_bytes(silence)
-                else:
-                    frame.buf.clear()
-                    for byte_val in silence:
-                        frame.buf.append(byte_val)
-            if hasattr(frame, 'size'):
-                frame.size = len(silence)
+            # Get audio from ring (non-blocking); ring frames are exactly frame_size_bytes
+            audio_data = self.tx_ring.try_pop()
+            if audio_data is not None:
+                self._fill(frame.buf, audio_data)
+            else:
+                # Return silence if ring is empty
+                frame.buf = self._silence_vec
         except Exception:
             # Return silence on error
-            silence = b'\x00' * self.frame_size_bytes
-            if hasattr(frame, 'buf'):
-                if hasattr(frame.buf, 'assign_from_bytes'):
-                    frame.buf.assign_from_bytes(silence)
-                else:
-                    frame.buf.clear()
-                    for byte_val in silence:
-                        frame.buf.append(byte_val)
-            if hasattr(frame, 'size'):
-                frame.size = len(silence)
+            frame.buf = self._silence_vec
+        frame.size = self.frame_size_bytes
 
 
 class PJSIPAccount(pj.Account):
@@ -134,6 +157,16 @@ class PJSIPAccount(pj.Account):
         pj.Account.__init__(self)
         self.adapter = adapter
     
+    def onRegState(self, prm):
+        """Handle registration state changes (signals start() as soon as we are registered)."""
+        if self.getInfo().regIsActive:
+            if not self.adapter.registered:
+                logger.info("✅ PJSIP account registered")
+                self.adapter.registered = True
+                self.adapter._notify_registered()
+        else:
+            self.adapter.registered = False
+    
     def onIncomingCall(self, prm):
         """Handle incoming call."""
         call = PJSIPCall(self.adapter, self, prm.callId)
@@ -141,59 +174,35 @@ class PJSIPAccount(pj.Account):
         
         # Extract caller information
         remote_uri = call_info.remoteUri
-        caller_id = "unknown"
         
         # Parse URI: sip:number@domain or "Name" <sip:number@domain>
-        if remote_uri:
-            match = re.search(r'sip:([^@]+)@', remote_uri)
-            if match:
-                caller_id = match.group(1)
-            else:
-                # Try to extract from display name
-                match = re.search(r'["\']([^"\']+)["\']', remote_uri)
-                if match:
-                    caller_id = match.group(1)
+        caller_id = extract_caller_id(remote_uri)
         
         call_id = call_info.callIdString
         
-        print(f"📞 Incoming call from PJSIP: {caller_id} (Call-ID: {call_id})")
+        logger.info("📞 Incoming call from PJSIP: %s (Call-ID: %s)", caller_id, call_id)
         
-        # Create call info dictionary
-        call_info_dict = {
-            "call_id": call_id,
-            "caller_id": caller_id,
-            "from_header": remote_uri,
-            "to_header": call_info.localUri,
-            "remote_ip": "",  # Will be extracted from RTP if needed
-            "remote_port": 0,
-            "rtp_info": {},
-            "pjsip_call": call,  # Store the PJSIP call object
-            "sample_rate": 8000,  # Default, will be updated from media info
-        }
+        # Create call info (remote IP/port stay empty - PJSIP owns the media transport)
+        call_info_obj = CallInfo(
+            call_id=call_id,
+            caller_id=caller_id,
+            from_header=remote_uri,
+            to_header=call_info.localUri,
+            pjsip_call=call,  # Store the PJSIP call object
+            sample_rate=8000,  # Default, will be updated from media info
+        )
         
         # Get media info to determine sample rate
         try:
             media_info = call.getStreamInfo(0)  # Get first audio stream
             if media_info and hasattr(media_info, 'codecName'):
                 # PJSIP typically uses 8kHz for G.711
-                call_info_dict["sample_rate"] = 8000
+                call_info_obj.sample_rate = 8000
         except Exception as e:
-            print(f"⚠️  Could not get media info: {e}")
+            logger.warning("⚠️  Could not get media info: %s", e)
         
-        # Add to active calls
-        self.adapter.active_calls[call_id] = call_info_dict
-        
-        # Bridge to async handler
-        if self.adapter.on_incoming_call and self.adapter.loop:
-            try:
-                asyncio.run_coroutine_threadsafe(
-                    self.adapter.on_incoming_call(caller_id, call_info_dict),
-                    self.adapter.loop
-                )
-            except Exception as e:
-                print(f"❌ Error calling async callback: {e}")
-                import traceback
-                traceback.print_exc()
+        # Track the call and bridge to async handler
+        self.adapter._bridge_incoming_call(caller_id, call_info_obj)
 
 
 class PJSIPCall(pj.Call):
@@ -202,9 +211,14 @@ class PJSIPCall(pj.Call):
     def __init__(self, adapter, account, call_id=-1):
         pj.Call.__init__(self, account, call_id)
         self.adapter = adapter
-        # Audio queues for bridging to async
-        self.audio_rx_queue = queue.Queue(maxsize=10)  # Incoming audio from call
-        self.audio_tx_queue = queue.Queue(maxsize=10)  # Outgoing audio to call
+        # Audio frame rings for bridging to async (PJSIP media thread <-> asyncio loop)
+        self.audio_rx_ring = SPSCFrameRing(AUDIO_RING_FRAMES, PCM16_FRAME_BYTES)  # Incoming audio from call
+        self.audio_tx_ring = SPSCFrameRing(AUDIO_RING_FRAMES, PCM16_FRAME_BYTES)  # Outgoing audio to call
+        self._rx_since_discard = 0  # Frames returned since the last backlog discard
+        self._rx_ready: Optional[asyncio.Event] = None  # Created on the loop by get_audio_frame_async
+        self._rx_waiting = False  # Only signal the loop while a coroutine is waiting
+        self._rx_frame_event = threading.Event()  # Wakes the deprecated blocking get_audio_frame
+        self._rx_blocking = False  # Only signal it while a thread is blocked in get_audio_frame
         self.audio_running = False
         self.audio_port = None  # Will be set when audio media is active
         self.queue_port = None  # Custom AudioMediaPort for bridging
@@ -216,7 +230,8 @@ class PJSIPCall(pj.Call):
             prm: CallStateParam from PJSIP
         """
         ci = self.getInfo()
-        print(f"📞 Call state changed: {ci.stateText} (code: {ci.lastStatusCode})")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📞 Call state changed: %s (code: %s)", ci.stateText, ci.lastStatusCode)
         
         if ci.state == pj.PJSIP_INV_STATE_DISCONNECTED:
             call_id = ci.callIdString
@@ -231,7 +246,10 @@ class PJSIPCall(pj.Call):
                     pass
             
             if call_id in self.adapter.active_calls:
-                print(f"📞 Call {call_id} disconnected")
+                logger.info("📞 Call %s disconnected", call_id)
+            
+            # Wake up anyone waiting for this call to end
+            self.adapter._resolve_call_ended(call_id)
     
     def onCallMediaState(self, prm):
         """Handle media state changes.
@@ -248,18 +266,18 @@ class PJSIPCall(pj.Call):
                         # Get endpoint for audio device manager
                         ep = self.adapter.ep if self.adapter else None
                         if not ep:
-                            print("⚠️  No endpoint available for audio routing")
+                            logger.warning("⚠️  No endpoint available for audio routing")
                             return
                         
                         # Get audio media for this call
                         aud_med = self.getAudioMedia(-1)  # Get first audio media
                         if not aud_med:
-                            print("⚠️  Could not get audio media")
+                            logger.warning("⚠️  Could not get audio media")
                             return
                         
                         self.audio_running = True
                         self.audio_port = aud_med  # Store for audio bridge
-                        print(f"✅ Audio stream active for call {ci.callIdString}")
+                        logger.info("✅ Audio stream active for call %s", ci.callIdString)
 
                         # Ensure there is a consumer pulling audio frames (important in headless mode)
                         pb = self.adapter.ep.audDevManager().getPlaybackDevMedia()
@@ -268,10 +286,11 @@ class PJSIPCall(pj.Call):
                         # Create custom AudioMediaPort for bridging
                         try:
                             self.queue_port = QueueAudioPort(
-                                self.audio_rx_queue,
-                                self.audio_tx_queue,
+                                self.audio_rx_ring,
+                                self.audio_tx_ring,
                                 sample_rate=8000,
-                                frame_size_ms=20
+                                frame_size_ms=20,
+                                on_rx=self._notify_rx,
                             )
                             
                             # Connect the queue port to the call's audio media
@@ -281,124 +300,108 @@ class PJSIPCall(pj.Call):
                             aud_med.startTransmit(self.queue_port)  # Call -> Queue (RX)
                             self.queue_port.startTransmit(aud_med)  # Queue -> Call (TX)
                             
-                            print(f"🎵 Audio bridge connected (RX: call->queue, TX: queue->call)")
+                            logger.info("🎵 Audio bridge connected (RX: call->queue, TX: queue->call)")
                         except Exception as e:
-                            print(f"⚠️  Error creating audio bridge port: {e}")
-                            import traceback
-                            traceback.print_exc()
+                            logger.exception("⚠️  Error creating audio bridge port: %s", e)
                     except Exception as e:
-                        print(f"⚠️  Error setting up audio media: {e}")
-                        import traceback
-                        traceback.print_exc()
+                        logger.exception("⚠️  Error setting up audio media: %s", e)
                 else:
-                    print(f"⚠️  Audio stream status: {mi.status} for call {ci.callIdString}")
+                    logger.warning("⚠️  Audio stream status: %s for call %s", mi.status, ci.callIdString)
+    
+    def _pop_rx_frame(self):
+        """Pop the next uplink frame, discarding stale frames if the backlog grew too large."""
+        rx_ring = self.audio_rx_ring
+        # Progressive discard: if the consumer fell behind, drop one stale frame
+        # every few reads until the backlog is back under the latency budget
+        if len(rx_ring) > RX_MAX_BACKLOG_FRAMES and self._rx_since_discard >= RX_DISCARD_SPACING:
+            rx_ring.try_pop()
+            self._rx_since_discard = 0
+        frame = rx_ring.try_pop()
+        if frame is not None:
+            self._rx_since_discard += 1
+        return frame
+    
+    def _notify_rx(self):
+        """Wake a waiting frame reader after a frame was received (PJSIP media thread)."""
+        if self._rx_blocking:
+            self._rx_frame_event.set()
+        event = self._rx_ready
+        if self._rx_waiting and event is not None and self.adapter.loop:
+            try:
+                self.adapter.loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # Loop might be closing
     
     def get_audio_frame(self, blocking=False):
         """Get audio frame from call (for uplink)."""
+        frame = self._pop_rx_frame()
+        if frame is None and blocking:
+            warnings.warn(
+                "get_audio_frame(blocking=True) blocks the calling thread; use get_audio_frame_async()",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+            # Wait up to one frame interval, returning as soon as the media thread delivers
+            self._rx_frame_event.clear()
+            self._rx_blocking = True
+            try:
+                # Re-check after arming so a frame pushed in between is not missed
+                frame = self._pop_rx_frame()
+                if frame is None and self._rx_frame_event.wait(0.02):
+                    frame = self._pop_rx_frame()
+            finally:
+                self._rx_blocking = False
+        return frame
+    
+    async def get_audio_frame_async(self, timeout: Optional[float] = 0.02):
+        """Get audio frame from call, waiting on the event loop until one arrives.
+        
+        Returns None if no frame arrived within timeout seconds.
+        """
+        frame = self._pop_rx_frame()
+        if frame is not None:
+            return frame
+        
+        if self._rx_ready is None:
+            self._rx_ready = asyncio.Event()
+        self._rx_ready.clear()
+        self._rx_waiting = True
         try:
-            if blocking:
-                return self.audio_rx_queue.get(timeout=0.02)
-            else:
-                return self.audio_rx_queue.get_nowait()
-        except:
-            return None
+            # Re-check after arming so a frame pushed in between is not missed
+            frame = self._pop_rx_frame()
+            if frame is None:
+                try:
+                    await asyncio.wait_for(self._rx_ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+                frame = self._pop_rx_frame()
+        finally:
+            self._rx_waiting = False
+        return frame
     
     def put_audio_frame(self, audio_data):
         """Put audio frame to call (for downlink)."""
-        try:
-            self.audio_tx_queue.put_nowait(audio_data)
-        except:
-            pass
+        self.audio_tx_ring.try_push(audio_data)
 
 
-class PJSIPAdapter:
+class PJSIPAdapter(BaseSIPAdapter):
     """Async-compatible adapter for PJSIP's pjsua2."""
     
-    def __init__(
-        self,
-        server: str,
-        username: str,
-        password: str,
-        display_name: str = "HA Voice Assistant",
-        transport: str = "udp",
-        port: int = 5060,
-        bind_port: Optional[int] = None,
-        on_incoming_call: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None,
-    ):
+    def __init__(self, *args, **kwargs):
         if not PJSIP_AVAILABLE:
             raise ImportError("pjsua2 is not available. Please install PJSIP.")
         
-        self.server = server
-        self.username = username
-        self.password = password
-        self.display_name = display_name
-        self.transport = transport
-        self.server_port = port
-        self.local_port = bind_port if bind_port is not None else port
-        self.on_incoming_call = on_incoming_call
-        
-        # Get local IP
-        self.local_ip = self._get_local_ip()
+        super().__init__(*args, **kwargs)
         
         # PJSIP components
         self.ep: Optional[pj.Endpoint] = None
         self.account: Optional[PJSIPAccount] = None
         
-        # Running state
-        self.running = False
-        self.registered = False
-        
-        # Active calls tracking
-        self.active_calls: Dict[str, Dict[str, Any]] = {}
+        # Shutdown signalling (registration is signalled via _notify_registered)
+        self._stopped_event: Optional[asyncio.Event] = None  # Set once the PJSIP thread has torn down
         
         # Thread for PJSIP (it runs in a separate thread)
         self.pjsip_thread: Optional[threading.Thread] = None
-        self.pjsip_lock = threading.Lock()
-        
-        # Event loop reference for callbacks
-        self.loop: Optional[asyncio.AbstractEventLoop] = None
-    
-    def _get_local_ip(self) -> str:
-        def try_target(host: str, port: int) -> Optional[str]:
-            try:
-                # Prefer IPv4, then IPv6
-                infos = socket.getaddrinfo(host, port, 0, socket.SOCK_DGRAM)
-                # Sort so AF_INET (IPv4) comes first
-                infos.sort(key=lambda x: 0 if x[0] == socket.AF_INET else 1)
-                for family, socktype, proto, _, sockaddr in infos:
-                    try:
-                        s = socket.socket(family, socket.SOCK_DGRAM)
-                        s.connect(sockaddr)
-                        ip = s.getsockname()[0]
-                        s.close()
-                        return ip
-                    except Exception:
-                        continue
-            except Exception:
-                pass
-            return None
-
-        # 1) Try the configured SIP server (best: on-LAN registrar like fritz.box)
-        ip = try_target(self.server, getattr(self, "server_port", 5060))
-        if ip:
-            return ip
-
-        # 2) Optional: a LAN hint host (expose as config if you like)
-        lan_hint = getattr(self, "lan_hint_host", None)
-        if lan_hint:
-            ip = try_target(lan_hint, getattr(self, "server_port", 5060))
-            if ip:
-                return ip
-
-        # 3) Last resort: generic route chooser
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
-        except Exception:
-            return "127.0.0.1"
     
     def _run_pjsip(self):
         """Run PJSIP endpoint in a separate thread."""
@@ -415,6 +418,11 @@ class PJSIPAdapter:
             ep_cfg.logConfig.consoleLevel = 0  # Disable all PJSIP console logs
             ep_cfg.uaConfig.maxCalls = 10
             ep_cfg.uaConfig.userAgent = self.display_name
+            # Adaptive jitter buffer: PJSIP sees RTP timestamps/arrival times, so tune it there
+            ep_cfg.medConfig.jbInit = JB_INIT_MS
+            ep_cfg.medConfig.jbMinPre = JB_MIN_PREFETCH_MS
+            ep_cfg.medConfig.jbMaxPre = JB_MAX_PREFETCH_MS
+            ep_cfg.medConfig.jbMax = JB_MAX_MS
             
             # Initialize endpoint (must be done before thread registration)
             self.ep.libInit(ep_cfg)
@@ -432,6 +440,9 @@ class PJSIPAdapter:
             # Create UDP transport
             transport_cfg = pj.TransportConfig()
             transport_cfg.port = self.local_port
+            if self.configured_local_ip:
+                # Advertise the configured address in Via/Contact instead of PJSIP's own pick
+                transport_cfg.publicAddress = self.configured_local_ip
             self.ep.transportCreate(pj.PJSIP_TRANSPORT_UDP, transport_cfg)
             
             # Start endpoint
@@ -447,6 +458,9 @@ class PJSIPAdapter:
             acc_cfg = pj.AccountConfig()
             acc_cfg.idUri = f"sip:{self.username}@{self.server}"
             acc_cfg.regConfig.registrarUri = f"sip:{self.server}:{self.server_port}"
+            if self.configured_local_ip:
+                # Same address for RTP in the SDP we send
+                acc_cfg.mediaConfig.transportConfig.publicAddress = self.configured_local_ip
             
             # Add authentication credentials
             auth_cred = pj.AuthCredInfo()
@@ -461,29 +475,37 @@ class PJSIPAdapter:
             self.account = PJSIPAccount(self)
             self.account.create(acc_cfg)
             
-            # Wait for registration
-            import time
-            for _ in range(10):  # Wait up to 5 seconds
-                time.sleep(0.5)
-                acc_info = self.account.getInfo()
-                if acc_info.regIsActive:
-                    self.registered = True
-                    print("✅ PJSIP account registered")
-                    break
-            
-            if not self.registered:
-                print("⚠️  PJSIP registration not confirmed yet")
-            
-            # Keep endpoint running
+            # Keep endpoint running: libHandleEvents blocks until an event or the timeout,
+            # so no extra sleep is needed. Poll faster while calls are active.
             while self.running:
-                self.ep.libHandleEvents(100)  # Handle events with 100ms timeout
-                time.sleep(0.1)
+                timeout_ms = EVENT_POLL_ACTIVE_MS if self.active_calls else EVENT_POLL_IDLE_MS
+                self.ep.libHandleEvents(timeout_ms)
             
         except Exception as e:
-            print(f"❌ Error in PJSIP thread: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Error in PJSIP thread: %s", e)
             self.registered = False
+        finally:
+            self._shutdown_endpoint()
+    
+    def _shutdown_endpoint(self):
+        """Hang up all calls and destroy the endpoint (runs on the PJSIP thread)."""
+        if self.ep:
+            try:
+                self.ep.hangupAllCalls()
+            except Exception as e:
+                logger.warning("⚠️  Error hanging up calls: %s", e)
+            try:
+                self.ep.libDestroy()
+                logger.info("✅ PJSIP endpoint stopped")
+            except Exception as e:
+                logger.warning("⚠️  Error stopping PJSIP endpoint: %s", e)
+        
+        # Wake up stop()
+        if self.loop and self._stopped_event:
+            try:
+                self.loop.call_soon_threadsafe(self._stopped_event.set)
+            except RuntimeError:
+                pass  # Loop might be closing
     
     async def start(self):
         """Start the PJSIP endpoint (async wrapper)."""
@@ -492,18 +514,18 @@ class PJSIPAdapter:
         
         self.loop = asyncio.get_running_loop()
         self.running = True
+        self._stopped_event = asyncio.Event()
         
         # Start PJSIP in a separate thread
         self.pjsip_thread = threading.Thread(target=self._run_pjsip, daemon=True)
         self.pjsip_thread.start()
         
-        # Wait a bit for initialization
-        await asyncio.sleep(2)
-        
-        if self.registered:
+        # Wait for registration (returns as soon as onRegState reports it)
+        try:
+            await asyncio.wait_for(self._registered_event.wait(), REGISTRATION_TIMEOUT)
             print("✅ PJSIP registration confirmed")
-        else:
-            print("⚠️  PJSIP registration status: waiting...")
+        except asyncio.TimeoutError:
+            print("⚠️  PJSIP registration not confirmed yet")
     
     async def stop(self):
         """Stop the PJSIP endpoint (async wrapper)."""
@@ -512,44 +534,18 @@ class PJSIPAdapter:
         
         self.running = False
         
-        # Stop endpoint in thread-safe manner
-        if self.ep:
-            def stop_endpoint():
-                try:
-                    # Hangup all calls
-                    if self.account:
-                        acc_info = self.account.getInfo()
-                        for call_id in acc_info.calls:
-                            try:
-                                call = pj.Call()
-                                call = self.account.findCall(call_id)
-                                if call:
-                                    call.hangup(pj.CallOpParam())
-                            except Exception as e:
-                                print(f"⚠️  Error hanging up call: {e}")
-                    
-                    # Destroy endpoint
-                    self.ep.libDestroy()
-                    print("✅ PJSIP endpoint stopped")
-                except Exception as e:
-                    print(f"⚠️  Error stopping PJSIP endpoint: {e}")
-            
-            # Run stop in executor to avoid blocking
-            await asyncio.get_event_loop().run_in_executor(None, stop_endpoint)
+        # The PJSIP thread tears the endpoint down itself once its event loop exits
+        # (libDestroy must run on the thread registered with PJSIP)
+        if self.pjsip_thread and self.pjsip_thread.is_alive() and self._stopped_event:
+            try:
+                await asyncio.wait_for(self._stopped_event.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                logger.warning("⚠️  Timed out waiting for PJSIP endpoint to stop")
         
         # Wait for thread to finish
         if self.pjsip_thread:
             self.pjsip_thread.join(timeout=5)
         
         self.registered = False
-        self.active_calls.clear()
-    
-    def get_call_info(self, call_id: str) -> Optional[Dict[str, Any]]:
-        """Get information about an active call."""
-        return self.active_calls.get(call_id)
-    
-    def _schedule_refresh_after_call(self):
-        """Schedule registration refresh after call ends (no-op for PJSIP)."""
-        # PJSIP handles registration refresh internally, so this is a no-op
-        pass
-
+        self._registered_event.clear()
+        self._clear_calls()
@@ -1,65 +1,42 @@
 """Adapter for pyVoIP library to provide async-compatible interface."""
 import asyncio
 import threading
-import socket
+import time
+import traceback
 import re
-from typing import Optional, Callable, Awaitable, Dict, Any
-from pyVoIP.VoIP import VoIPPhone, VoIPCall, InvalidStateError
+from typing import Optional
+from pyVoIP.VoIP import VoIPPhone, VoIPCall, CallState, InvalidStateError
+from app.sip.base_adapter import BaseSIPAdapter
+from app.sip.call_info import CallInfo
+from app.sip.net_utils import get_local_ip
+from app.sip.uri import extract_caller_id
 
+# Sent-by address in a Via header, e.g. "SIP/2.0/UDP 192.168.1.1:5060;branch=..."
+_VIA_ADDR_RE = re.compile(r'(\d{1,3}(?:\.\d{1,3}){3})(?::(\d+))?')
 
-class PyVoIPAdapter:
+# Seconds between call state checks while waiting for a call to end
+CALL_STATE_POLL_INTERVAL = 0.2
+
+
+class PyVoIPAdapter(BaseSIPAdapter):
     """Async-compatible adapter for pyVoIP's VoIPPhone."""
     
-    def __init__(
-        self,
-        server: str,
-        username: str,
-        password: str,
-        display_name: str = "HA Voice Assistant",
-        transport: str = "udp",
-        port: int = 5060,
-        bind_port: Optional[int] = None,
-        on_incoming_call: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None,
-    ):
-        self.server = server
-        self.username = username
-        self.password = password
-        self.display_name = display_name
-        self.transport = transport
-        self.server_port = port
-        self.local_port = bind_port if bind_port is not None else port
-        self.on_incoming_call = on_incoming_call
-        
-        # Get local IP
-        self.local_ip = self._get_local_ip()
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         
         # pyVoIP phone instance
         self.phone: Optional[VoIPPhone] = None
         
-        # Running state
-        self.running = False
-        self.registered = False
-        
-        # Active calls tracking
-        self.active_calls: Dict[str, Dict[str, Any]] = {}
-        
         # Thread for pyVoIP (it runs in a separate thread)
         self.phone_thread: Optional[threading.Thread] = None
-        self.phone_lock = threading.Lock()
-        
-        # Event loop reference for callbacks
-        self.loop: Optional[asyncio.AbstractEventLoop] = None
     
     def _get_local_ip(self) -> str:
-        """Get local IP address."""
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
-        except Exception:
-            return "127.0.0.1"
+        """Get local IP address (cached for the whole process).
+        
+        Not targeted at the SIP server: pyVoIP has always used the default-route
+        address, then a route towards a public host.
+        """
+        return get_local_ip()
     
     def _get_header_value(self, headers: dict, key: str, default: str = "") -> str:
         """Get header value, handling string, list, and dict formats."""
@@ -89,57 +66,40 @@ class PyVoIPAdapter:
         if via_header:
             # Via: SIP/2.0/UDP 192.168.1.1:5060;branch=...
             # Extract IP and port from Via header
-            match = re.search(r'(\d+\.\d+\.\d+\.\d+)(?::(\d+))?', str(via_header))
+            match = _VIA_ADDR_RE.search(str(via_header))
             if match:
                 remote_ip = match.group(1)
                 if match.group(2):
                     remote_port = int(match.group(2))
         
         # Extract caller number from From header (format: "Name" <sip:number@domain> or sip:number@domain)
-        caller_id = "unknown"
-        if from_header:
-            # Try to extract number from From header
-            match = re.search(r'sip:([^@]+)@', from_header)
-            if match:
-                caller_id = match.group(1)
-            else:
-                # Fallback: try to extract from quoted name
-                match = re.search(r'["\']([^"\']+)["\']', from_header)
-                if match:
-                    caller_id = match.group(1)
+        caller_id = extract_caller_id(from_header)
         
         # Use call_id directly (it's already unique)
         call_id = call_id_str
         
         print(f"📞 Incoming call from pyVoIP: {caller_id} (Call-ID: {call_id})")
         
-        # Create call info dictionary matching our current interface
-        call_info = {
-            "call_id": call_id,
-            "caller_id": caller_id,
-            "from_header": from_header,
-            "to_header": self._get_header_value(request.headers, "To", f"<sip:{self.username}@{self.server}>"),
-            "remote_ip": remote_ip,
-            "remote_port": remote_port,
-            "rtp_info": {},  # pyVoIP handles RTP internally
-            "voip_call": call,  # Store the pyVoIP call object
-        }
-        
-        # Add to active calls
-        self.active_calls[call_id] = call_info
-        
-        # Bridge to async handler
-        if self.on_incoming_call and self.loop:
-            try:
-                # Schedule async callback in the event loop
-                asyncio.run_coroutine_threadsafe(
-                    self.on_incoming_call(caller_id, call_info),
-                    self.loop
-                )
-            except Exception as e:
-                print(f"❌ Error calling async callback: {e}")
-                import traceback
-                traceback.print_exc()
+        # Create call info matching our current interface
+        call_info = CallInfo(
+            call_id=call_id,
+            caller_id=caller_id,
+            from_header=from_header,
+            to_header=self._get_header_value(request.headers, "To", f"<sip:{self.username}@{self.server}>"),
+            remote_ip=remote_ip,
+            remote_port=remote_port,
+            rtp_info={},  # pyVoIP handles RTP internally
+            voip_call=call,  # Store the pyVoIP call object
+        )
+        
+        # Track the call and bridge to async handler
+        self._bridge_incoming_call(caller_id, call_info)
+        
+        # pyVoIP runs this callback on a thread of its own per call but has no
+        # "call ended" hook: wait here, then wake wait_for_call_end()
+        while self.running and call.state != CallState.ENDED:
+            time.sleep(CALL_STATE_POLL_INTERVAL)
+        self._resolve_call_ended(call_id)
     
     async def start(self):
         """Start the pyVoIP phone (async wrapper)."""
@@ -174,9 +134,9 @@ class PyVoIPAdapter:
                 self.phone.start()
                 self.registered = True
                 print("✅ pyVoIP phone started and registered")
+                self._notify_registered()
             except Exception as e:
                 print(f"❌ Error starting pyVoIP phone: {e}")
-                import traceback
                 traceback.print_exc()
                 self.registered = False
         
@@ -216,14 +176,5 @@ class PyVoIPAdapter:
             self.phone_thread.join(timeout=5)
         
         self.registered = False
-        self.active_calls.clear()
-    
-    def get_call_info(self, call_id: str) -> Optional[Dict[str, Any]]:
-        """Get information about an active call."""
-        return self.active_calls.get(call_id)
-    
-    def _schedule_refresh_after_call(self):
-        """Schedule registration refresh after call ends (no-op for pyVoIP)."""
-        # pyVoIP handles registration internally, so this is a no-op
-        pass
+        self._clear_calls()
 
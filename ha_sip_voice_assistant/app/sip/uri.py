@@ -0,0 +1,29 @@
+"""SIP URI helpers shared by the SIP adapters."""
+import re
+
+# Fallback only: quoted display name, e.g. "Alice" <sip:...>
+_DISPLAY_NAME_RE = re.compile(r'["\']([^"\']+)["\']')
+
+
+def extract_caller_id(uri: str) -> str:
+    """Extract the caller ID from a From header / remote URI.
+
+    Handles sip:number@domain and "Name" <sip:number@domain>. The common case
+    (user part of the SIP URI) is a plain string scan; the display name regex
+    is only used when there is no user part.
+    """
+    if not uri:
+        return "unknown"
+
+    start = uri.find("sip:")
+    if start >= 0:
+        start += 4
+        end = uri.find("@", start)
+        if end > start:
+            return uri[start:end]
+
+    match = _DISPLAY_NAME_RE.search(uri)
+    if match:
+        return match.group(1)
+
+    return "unknown"
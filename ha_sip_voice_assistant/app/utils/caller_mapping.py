@@ -1,42 +1,112 @@
 """Caller ID to configuration mapping utilities."""
-from typing import Dict, Any
-from app.config import Config
+import logging
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+from app.config import Config, caller_id_variant
 
+logger = logging.getLogger(__name__)
 
-def _render_instructions(template: str, name: str) -> str:
+try:
+    from jinja2 import Environment
+except ImportError:
+    Environment = None
+    logger.warning("⚠️  jinja2 not installed - templates beyond {{ name }} are used as-is. Please run: poetry install")
+
+# Fallback instructions and the settings used when no profile applies (shared, read-only)
+_DEFAULT_INSTRUCTIONS = "You are a helpful assistant."
+_NO_TOOLS = ()
+_DEFAULT_SETTINGS: Mapping[str, Any] = MappingProxyType({
+    "language": "en",
+    "instructions": _DEFAULT_INSTRUCTIONS,
+    "available_tools": _NO_TOOLS,
+})
+
+# The one placeholder templates normally use: {{ name }} (any inner whitespace)
+_NAME_PLACEHOLDER_RE = re.compile(r"\{\{\s*name\s*\}\}")
+
+# Shared Jinja2 environment (plain text, templates never reloaded)
+_environment = Environment(autoescape=False, auto_reload=False) if Environment is not None else None
+
+
+@lru_cache(maxsize=64)
+def _compile(template: str):
+    """Compile an instructions template once (one per profile in practice)."""
+    return _environment.from_string(template)
+
+
+def _freeze_tools(tools) -> tuple:
+    """Return a profile's tool list as a tuple, so cached settings cannot be mutated."""
+    return tuple(tools) if tools else _NO_TOOLS
+
+
+def _substitute_name(template: str, name: Any) -> Optional[str]:
+    """Render a template whose only Jinja syntax is {{ name }}; None if it uses anything else.
+    
+    Any other brace or a carriage return (which Jinja normalizes to a newline) in
+    the literal text leaves the template to Jinja2, so both paths render alike.
+    """
+    parts = _NAME_PLACEHOLDER_RE.split(template)
+    if any("{" in part or "}" in part or "\r" in part for part in parts):
+        return None
+    # YAML may give a non-string name (e.g. name: 123) - Jinja prints it via str() too
+    return str(name).join(parts)
+
+
+def _render_instructions(template: Optional[str], name: Any) -> str:
     """
     Render instructions template with caller name using Jinja2.
     
     Use Jinja2 syntax in templates, e.g.: {{ name }}
     Example: "Hello {{ name }}, how can I help you?"
+    
+    Plain text and plain {{ name }} substitution skip Jinja2 entirely.
+    
+    Always returns non-blank instructions: a missing/empty template, a blank
+    result or a render error yields the default instructions, so callers need
+    no further checks.
     """
     if not template:
-        return "You are a helpful assistant."
+        return _DEFAULT_INSTRUCTIONS
+    
+    if "{" not in template and "\r" not in template:
+        # Fast path: no Jinja delimiters and no newlines to normalize, nothing to render
+        rendered = template
+    else:
+        rendered = _substitute_name(template, name)
+    
+    if rendered is not None:
+        # Match Jinja's default of dropping a single trailing newline
+        if rendered.endswith("\n"):
+            rendered = rendered[:-1]
+        if not rendered.strip():
+            return _DEFAULT_INSTRUCTIONS
+        return rendered
+    
+    if _environment is None:
+        # jinja2 missing (warned at import): use the template text unrendered
+        return template if template.strip() else _DEFAULT_INSTRUCTIONS
     
     try:
-        from jinja2 import Template
-        
-        jinja_template = Template(template)
-        rendered = jinja_template.render(name=name)
+        rendered = _compile(template).render(name=name)
         
         if not rendered or not rendered.strip():
-            return "You are a helpful assistant."
+            return _DEFAULT_INSTRUCTIONS
         
         return rendered
-    except ImportError:
-        print("❌ ERROR: jinja2 not installed! Please run: poetry install")
-        raise
     except Exception as e:
-        print(f"❌ ERROR: Jinja2 rendering failed: {e}")
-        import traceback
-        traceback.print_exc()
-        return "You are a helpful assistant."
+        logger.exception("❌ ERROR: Jinja2 rendering failed: %s", e)
+        return _DEFAULT_INSTRUCTIONS
 
 
-def get_caller_settings(config: Config, caller_id: str) -> Dict[str, Any]:
+def get_caller_settings(config: Config, caller_id: str) -> Mapping[str, Any]:
     """
     Get caller-specific settings (language, instructions, tools) by resolving profiles.
     
+    Results are cached per caller until the config is reloaded, and returned as
+    read-only mappings since they are shared between calls.
+    
     Resolution order:
     1. Get caller config (if exists)
     2. If caller has a profile, use that profile
@@ -48,6 +118,28 @@ def get_caller_settings(config: Config, caller_id: str) -> Dict[str, Any]:
     Note: Welcome messages should be included in instructions, e.g.:
     "Start the conversation by saying: Hello, how can I help you?"
     """
+    return _resolve_caller_settings(config, caller_id, config.version)
+
+
+def warm_caller_settings(config: Config) -> None:
+    """
+    Resolve settings for every configured caller up front (call after config.load()).
+    
+    Incoming calls from known callers then only hit the settings cache; for
+    other callers the default profile's template is already compiled.
+    """
+    for caller_id in config.callers:
+        get_caller_settings(config, caller_id)
+        # Also the +/no-+ variant matched by get_caller_config
+        get_caller_settings(config, caller_id_variant(caller_id))
+    
+    # Callers without caller ID, and the default profile template for everyone else
+    get_caller_settings(config, "unknown")
+
+
+@lru_cache(maxsize=256)
+def _resolve_caller_settings(config: Config, caller_id: str, config_version: int) -> Mapping[str, Any]:
+    """Resolve settings for a caller (config_version only serves as cache key)."""
     caller_config = config.get_caller_config(caller_id)
     profile_name = None
     profile_config = None
@@ -67,43 +159,25 @@ def get_caller_settings(config: Config, caller_id: str) -> Dict[str, Any]:
         if profile_name:
             profile_config = config.get_profile_config(profile_name)
             if profile_config:
-                instructions_template = profile_config.get("instructions", "You are a helpful assistant.")
-                if not instructions_template:
-                    instructions_template = "You are a helpful assistant."
+                instructions = _render_instructions(profile_config.get("instructions"), caller_name)
                 
-                instructions = _render_instructions(instructions_template, caller_name)
-                
-                if not instructions or not instructions.strip():
-                    instructions = "You are a helpful assistant."
-                
-                return {
+                return MappingProxyType({
                     "language": profile_config.get("language", "en"),
                     "instructions": instructions,
-                    "available_tools": profile_config.get("available_tools", []),
-                }
+                    "available_tools": _freeze_tools(profile_config.get("available_tools")),
+                })
     
     # Try default profile
     default_profile = config.get_default_profile_config()
     if default_profile:
-        instructions_template = default_profile.get("instructions", "You are a helpful assistant.")
-        if not instructions_template:
-            instructions_template = "You are a helpful assistant."
-        
-        instructions = _render_instructions(instructions_template, caller_name)
-        
-        if not instructions or not instructions.strip():
-            instructions = "You are a helpful assistant."
+        instructions = _render_instructions(default_profile.get("instructions"), caller_name)
         
-        return {
+        return MappingProxyType({
             "language": default_profile.get("language", "en"),
             "instructions": instructions,
-            "available_tools": default_profile.get("available_tools", []),
-        }
+            "available_tools": _freeze_tools(default_profile.get("available_tools")),
+        })
     
     # Fallback to hardcoded defaults
-    return {
-        "language": "en",
-        "instructions": "You are a helpful assistant.",
-        "available_tools": [],
-    }
+    return _DEFAULT_SETTINGS
 
@@ -0,0 +1,30 @@
+"""Rate-limited logging for the 20ms audio path."""
+import logging
+import time
+from typing import Dict
+
+# Minimum seconds between repeats of the same warning
+WARN_INTERVAL = 1.0
+
+
+class ThrottledLogger:
+    """Logs each distinct warning message at most once per interval.
+
+    Throttling is keyed by the message format string, so a repeating warning
+    never hides a different one.
+    """
+
+    __slots__ = ("logger", "interval", "_last_warn")
+
+    def __init__(self, logger: logging.Logger, interval: float = WARN_INTERVAL):
+        self.logger = logger
+        self.interval = interval
+        self._last_warn: Dict[str, float] = {}  # Message format -> last time it was logged
+
+    def warning(self, msg: str, *args, exc_info: bool = False):
+        """Log a warning unless the same message was logged within the interval."""
+        now = time.monotonic()
+        if now - self._last_warn.get(msg, float("-inf")) < self.interval:
+            return
+        self._last_warn[msg] = now
+        self.logger.warning(msg, *args, exc_info=exc_info)
@@ -23,8 +23,11 @@ class TestApplication:
             # Start the application
             start_task = asyncio.create_task(self.app.start())
             
-            # Wait for a bit to see initialization
-            await asyncio.sleep(duration)
+            # Wait until SIP registration succeeds (or give up after duration seconds)
+            try:
+                await asyncio.wait_for(self.app.registered_event.wait(), duration)
+            except asyncio.TimeoutError:
+                print("⚠️  SIP registration not confirmed within the test duration")
             
             # Stop the application
             print("\n" + "=" * 60)